@@ -5,10 +5,12 @@ Configures and runs the API server.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+import os
 import uvicorn
 from api.routes import router
 
-app = FastAPI(title="Restaurant Sales Prediction API")
+app = FastAPI(title="Restaurant Sales Prediction API", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -22,4 +24,15 @@ app.add_middleware(
 app.include_router(router)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Reload mode only in development; production runs one worker per core
+    # with uvloop/httptools when they are installed ("auto" picks them up)
+    dev_mode = os.getenv("APP_ENV", "dev") == "dev"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=1 if dev_mode else int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        reload=dev_mode,
+    )
\ No newline at end of file
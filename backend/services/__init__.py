@@ -1,4 +1,14 @@
 # File: backend/services/__init__.py
 """
 Services package initialization.
-"""
\ No newline at end of file
+"""
+
+# Opt-in acceleration: when the Intel extension for scikit-learn is
+# installed, patch_sklearn() swaps in oneDAL-backed estimators
+# (LinearRegression, DecisionTreeRegressor, ...) with no API changes.
+# On systems without it, this is a no-op
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+except ImportError:
+    pass
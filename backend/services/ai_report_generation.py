@@ -4,154 +4,533 @@ AI-powered report generation using Anthropic's Claude API.
 Creates business insights based on analysis results.
 """
 import os
+import re
 import json
+import copy
+import hashlib
+import functools
+import collections
 from typing import Dict, Any, List
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    # orjson serializes/parses the large payloads several times faster than
+    # the stdlib encoder; fall back to json when it is not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+# Maximum number of parsed reports kept in the per-instance memo cache
+_MAX_CACHE = 128
+
+@functools.lru_cache(maxsize=1)
+def _get_api_key():
+    """Loads .env once per process and returns the Claude API key.
+
+    load_dotenv walks the filesystem looking for a .env file, which is too
+    expensive to repeat for every generator instantiated in a request handler.
+    """
+    load_dotenv()
+    return os.getenv("ANTHROPIC_API_KEY")
+
+# Matches a section header in the AI response in one compiled pass. A
+# header is either followed by a colon (inline style, "SUMMARY: text...",
+# with the text landing in the body split) or stands alone on its line
+# (markdown style, "## SUMMARY"); requiring one of the two keeps section
+# words inside ordinary sentences from splitting the text
+_SECTION_RE = re.compile(
+    r'(?im)^[ \t]*(?:#{1,6}[ \t]*|\d+\.[ \t]*)?\*{0,2}'
+    r'(summary|key[\s_]?insights|insights|recommendations?|future[\s_]?outlook|outlook|projections?)'
+    r'\*{0,2}[ \t]*(?::[ \t]*|[ \t]*$)'
+)
+
+# Maps a normalized header capture to the report key it opens
+_HEADER_TO_KEY = {
+    'summary': 'summary',
+    'key_insights': 'insights',
+    'insights': 'insights',
+    'recommendation': 'recommendations',
+    'recommendations': 'recommendations',
+    'future_outlook': 'future_outlook',
+    'outlook': 'future_outlook',
+    'projection': 'future_outlook',
+    'projections': 'future_outlook',
+}
+
+# Bullet markers that start a new list item
+_BULLET_CHARS = frozenset('-*•')
+
+
+class _FallbackReport(dict):
+    """Marks a template report produced because the API call failed.
+
+    Behaves exactly like the plain report dict for every consumer, but
+    lets the memo skip it: caching a degraded report would pin it for
+    those inputs and the API would never be retried.
+    """
+
+# Fallback-report dispatch table indexed by trend:
+# (insight template, extra recommendation, outlook trend word, outlook tail)
+_TREND_MESSAGES = {
+    'up': (
+        "Sales are trending upward by {pct:.1f}%, indicating positive business momentum.",
+        None,
+        "upward",
+        "Consider investing in additional capacity and staff training to meet increased demand."
+    ),
+    'down': (
+        "Sales are showing a downward trend of {pct:.1f}%, which requires attention.",
+        "Implement targeted promotions to reverse the declining sales trend.",
+        "downward",
+        "Focus on marketing and customer retention strategies to reverse this trend."
+    ),
+    'stable': (
+        "Sales patterns are relatively stable, providing a consistent revenue base.",
+        None,
+        "stable",
+        "Maintain current operations while looking for opportunities to increase efficiency and profit margins."
+    ),
+}
+
+# Defaults merged under the incoming summaries so the fallback report can
+# index keys directly instead of chaining dict.get calls
+_PRODUCT_SUMMARY_DEFAULTS = {
+    "top_category": "",
+    "top_category_percentage": 0,
+    "highest_margin_product": "",
+    "top_five_percentage": 0,
+}
+_PREDICTION_SUMMARY_DEFAULTS = {
+    "trend": "",
+    "trend_percentage": 0,
+    "max_predicted_day": "",
+    "min_predicted_day": "",
+}
+
+# Fixed prompt prefix shared by every report request. Keeping all immutable
+# instructions in one leading block (tagged with cache_control below) lets
+# the API serve repeat reports from its prompt cache; only the data section
+# appended after this varies between calls.
+_CACHED_PROMPT_PREFIX = (
+    "You are a business analyst specializing in restaurant sales data analysis. "
+    "Provide specific, data-driven insights based on the information provided.\n\n"
+    "## REPORT STRUCTURE\n"
+    "Please generate a comprehensive business report with the following sections:\n"
+    "1. SUMMARY: A concise overview of the restaurant's sales performance and key findings.\n"
+    "2. KEY_INSIGHTS: 4-6 specific, data-backed insights from the sales and product data.\n"
+    "3. RECOMMENDATIONS: 4-6 actionable recommendations for improving sales and business performance.\n"
+    "4. FUTURE_OUTLOOK: Projections for future performance and potential challenges/opportunities.\n\n"
+    "Use clear section headings and ensure recommendations are specific to this restaurant's data.\n\n"
+    "The sales and product data follows in the next block."
+)
+
+def _match_section_header(line: str) -> str:
+    """Returns the report section a header line opens, or None."""
+    lower_line = line.lower()
+    if ":" not in line and "#" not in line:
+        return None
+    if "summary" in lower_line:
+        return "summary"
+    if any(keyword in lower_line for keyword in ["key insights", "insights", "key_insights"]):
+        return "insights"
+    if any(keyword in lower_line for keyword in ["recommendations", "recommendation"]):
+        return "recommendations"
+    if any(keyword in lower_line for keyword in ["future outlook", "outlook", "projection", "future_outlook"]):
+        return "future_outlook"
+    return None
+
+class StreamingReportParser:
+    """Incremental section parser fed from a streaming Claude response.
+
+    Accumulates streamed text, closes a section as soon as the next header
+    arrives, and exposes the partially filled report so callers can forward
+    sections before the full response has finished generating.
+    """
+
+    def __init__(self, generator: "AIReportGenerator"):
+        self._generator = generator
+        self.report = {
+            "summary": "",
+            "insights": [],
+            "recommendations": [],
+            "future_outlook": ""
+        }
+        self._buffer = ""
+        self._current_section = None
+        self._section_text = ""
+
+    def feed(self, chunk: str) -> bool:
+        """Consumes a chunk of streamed text; returns True if a section closed."""
+        self._buffer += chunk
+        section_closed = False
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            section_closed = self._handle_line(line) or section_closed
+        return section_closed
+
+    def _handle_line(self, line: str) -> bool:
+        section = _match_section_header(line)
+        if section is not None:
+            if self._current_section and self._section_text:
+                self._generator._update_report_section(self.report, self._current_section, self._section_text)
+            self._current_section = section
+            self._section_text = ""
+            return True
+        if self._current_section and line.strip():
+            self._section_text += line + "\n"
+        return False
+
+    def finalize(self) -> Dict[str, Any]:
+        """Flushes any buffered text and returns the completed report."""
+        if self._buffer:
+            self._handle_line(self._buffer)
+            self._buffer = ""
+        if self._current_section and self._section_text:
+            self._generator._update_report_section(self.report, self._current_section, self._section_text)
+        self._generator._clean_report(self.report)
+        return self.report
+
 class AIReportGenerator:
     """Generates business insights reports using Claude."""
     
     def __init__(self):
-        load_dotenv()
-        self.api_key = os.getenv("ANTHROPIC_API_KEY")
+        self.api_key = _get_api_key()
         self.claude_api_url = "https://api.anthropic.com/v1/messages"
-        
+
+        # LRU memo of parsed reports keyed by a hash of the input data, so
+        # repeat analyses skip the API round-trip and token cost entirely
+        self._cache = collections.OrderedDict()
+
+        # Pooled session: keeps the TLS connection to the API alive across
+        # calls and retries transient failures with backoff
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        self.session.headers.update({
+            "x-api-key": self.api_key or "",
+            "anthropic-version": "2023-06-01",
+            "anthropic-beta": "prompt-caching-2024-07-31",
+            "content-type": "application/json"
+        })
+
         if not self.api_key:
             print("Warning: ANTHROPIC_API_KEY not found in environment variables.")
+
+    @staticmethod
+    def _cache_key(forecast_data, products_data, sales_patterns) -> str:
+        """Builds a stable content hash of the report inputs."""
+        inputs = {'f': forecast_data, 'p': products_data, 's': sales_patterns}
+        if orjson is not None:
+            # OPT_NON_STR_KEYS: the day/hour rollups are int-keyed dicts,
+            # which orjson rejects by default (stdlib json stringifies them)
+            canonical = orjson.dumps(inputs,
+                                     option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+                                     default=str)
+        else:
+            canonical = json.dumps(inputs, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(canonical, digest_size=16).hexdigest()
     
-    def generate_report(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_report(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any],
+                        sales_patterns: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Generates comprehensive report based on chart data and analysis results.
-        
+
         Args:
             forecast_data: Dictionary containing sales forecast data
             products_data: Dictionary containing product performance data
-            
+            sales_patterns: Optional precomputed day/hour revenue rollups
+
         Returns:
             Dictionary with the AI-generated report
         """
+        # Identical inputs produce the same report; serve repeats from the memo
+        key = self._cache_key(forecast_data, products_data, sales_patterns)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return copy.deepcopy(cached)
+
+        report = None
+        for report in self.generate_report_stream(forecast_data, products_data, sales_patterns):
+            pass
+        if report is None:
+            report = self._generate_fallback_report(forecast_data, products_data)
+
+        # Only memoize reports parsed from a real response; a fallback is a
+        # transient degradation and the next call should retry the API
+        if not isinstance(report, _FallbackReport):
+            self._cache[key] = copy.deepcopy(report)
+            if len(self._cache) > _MAX_CACHE:
+                self._cache.popitem(last=False)
+
+        return report
+
+    def generate_report_stream(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any],
+                               sales_patterns: Dict[str, Any] = None):
+        """
+        Streams the report from Claude, yielding the partially filled report
+        dict each time a section completes and the finished report last.
+
+        Streaming means the first sections are available after first-token
+        latency instead of after the full response has been generated.
+        """
         if not self.api_key:
-            return self._generate_fallback_report(forecast_data, products_data)
-        
+            yield self._generate_fallback_report(forecast_data, products_data)
+            return
+
         try:
             # Format input data for the AI
-            prompt = self._construct_ai_prompt(forecast_data, products_data)
-            
-            # Call Claude API
-            headers = {
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            }
-            
+            prompt = self._construct_ai_prompt(forecast_data, products_data, sales_patterns)
+
+            # The instruction block is identical across calls and tagged for
+            # prompt caching; only the data block changes per report
             data = {
                 "model": "claude-3-opus-20240229",
                 "max_tokens": 1500,
+                "stream": True,
                 "messages": [
                     {
-                        "role": "user", 
-                        "content": prompt
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": _CACHED_PROMPT_PREFIX,
+                                "cache_control": {"type": "ephemeral"}
+                            },
+                            {
+                                "type": "text",
+                                "text": prompt
+                            }
+                        ]
                     }
-                ],
-                "system": "You are a business analyst specializing in restaurant sales data analysis. Provide specific, data-driven insights based on the information provided."
+                ]
             }
-            
-            response = requests.post(
+
+            # Headers are preset on the pooled session; the explicit timeout
+            # keeps a hung connection from blocking the worker indefinitely
+            body = orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+            response = self.session.post(
                 self.claude_api_url,
-                headers=headers,
-                json=data
+                data=body,
+                stream=True,
+                timeout=(5, 60)
             )
-            
+
             if response.status_code != 200:
                 print(f"Error from Claude API: {response.status_code}")
                 print(response.text)
-                return self._generate_fallback_report(forecast_data, products_data)
-            
-            # Parse the response
-            response_data = response.json()
-            report_text = response_data["content"][0]["text"]
-            
-            # Split the report into sections based on headers
-            report = self._parse_ai_response(report_text)
-            
-            return report
-            
+                yield self._generate_fallback_report(forecast_data, products_data)
+                return
+
+            # Feed SSE text deltas into the incremental parser as they arrive
+            parser = StreamingReportParser(self)
+            for raw_line in response.iter_lines():
+                if not raw_line:
+                    continue
+                line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+                if not line.startswith('data:'):
+                    continue
+                payload = line[5:].strip()
+                try:
+                    event = orjson.loads(payload) if orjson is not None else json.loads(payload)
+                except ValueError:
+                    continue
+                if event.get('type') == 'content_block_delta':
+                    text = event.get('delta', {}).get('text', '')
+                    if text and parser.feed(text):
+                        yield dict(parser.report)
+
+            yield parser.finalize()
+
         except Exception as e:
             print(f"Error generating AI report: {str(e)}")
-            return self._generate_fallback_report(forecast_data, products_data)
+            yield self._generate_fallback_report(forecast_data, products_data)
     
-    def _construct_ai_prompt(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any]) -> str:
-        """Constructs a detailed prompt for the AI based on data."""
-        
-        # Convert data to readable format for AI
-        prompt = "Generate a detailed restaurant business report based on the following sales and product data:\n\n"
-        
+    async def generate_report_async(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any],
+                                    sales_patterns: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async wrapper around generate_report.
+
+        The blocking HTTP call runs in a worker thread so it never stalls
+        the FastAPI event loop; callers with many reports to generate
+        should prefer generate_reports_bulk, which overlaps the requests.
+        """
+        import asyncio
+        return await asyncio.to_thread(self.generate_report, forecast_data, products_data, sales_patterns)
+
+    async def generate_reports_bulk(self, jobs: List[tuple], max_concurrency: int = 5) -> List[Dict[str, Any]]:
+        """
+        Generates reports for several inputs concurrently.
+
+        Each job is a (forecast_data, products_data) or
+        (forecast_data, products_data, sales_patterns) tuple. The requests
+        overlap on one connection pool so total wall time is bounded by the
+        slowest call, not the sum; the semaphore keeps us under rate limits.
+        """
+        import asyncio
+        import httpx
+
+        if not self.api_key:
+            return [self._generate_fallback_report(job[0], job[1]) for job in jobs]
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        headers = dict(self.session.headers)
+
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=10), timeout=60) as client:
+
+            async def generate_one(job):
+                forecast_data, products_data = job[0], job[1]
+                sales_patterns = job[2] if len(job) > 2 else None
+
+                key = self._cache_key(forecast_data, products_data, sales_patterns)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+
+                prompt = self._construct_ai_prompt(forecast_data, products_data, sales_patterns)
+                data = {
+                    "model": "claude-3-opus-20240229",
+                    "max_tokens": 1500,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": _CACHED_PROMPT_PREFIX,
+                                    "cache_control": {"type": "ephemeral"}
+                                },
+                                {
+                                    "type": "text",
+                                    "text": prompt
+                                }
+                            ]
+                        }
+                    ]
+                }
+                body = orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+
+                async with semaphore:
+                    try:
+                        response = await client.post(self.claude_api_url, headers=headers, content=body)
+                        if response.status_code != 200:
+                            print(f"Error from Claude API: {response.status_code}")
+                            return self._generate_fallback_report(forecast_data, products_data)
+                        report_text = response.json()["content"][0]["text"]
+                        report = self._parse_ai_response(report_text)
+                        self._cache[key] = copy.deepcopy(report)
+                        if len(self._cache) > _MAX_CACHE:
+                            self._cache.popitem(last=False)
+                        return report
+                    except Exception as e:
+                        print(f"Error generating AI report: {str(e)}")
+                        return self._generate_fallback_report(forecast_data, products_data)
+
+            return list(await asyncio.gather(*(generate_one(job) for job in jobs)))
+
+    def _construct_ai_prompt(self, forecast_data: Dict[str, Any], products_data: Dict[str, Any],
+                             sales_patterns: Dict[str, Any] = None) -> str:
+        """Constructs the variable data section of the AI prompt.
+
+        The fixed instructions live in _CACHED_PROMPT_PREFIX so they can be
+        served from the API's prompt cache.
+        """
+        # Accumulate fragments and join once at the end; += on a growing
+        # string reallocates the whole buffer on every concatenation
+        parts = ["Generate a detailed restaurant business report based on the following sales and product data:\n\n"]
+
         # Add sales forecast data
         if forecast_data:
-            prompt += "## SALES FORECAST DATA\n"
-            
+            parts.append("## SALES FORECAST DATA\n")
+
+            # Pull the nested sections out once instead of re-indexing the
+            # dict chain for every field
+            prediction_results = forecast_data.get("prediction_results") or {}
+            summary = prediction_results.get("prediction_summary") or {}
+            best_model = prediction_results.get("best_model") or {}
+
             # Add prediction results summary
-            if "prediction_results" in forecast_data and "prediction_summary" in forecast_data["prediction_results"]:
-                summary = forecast_data["prediction_results"]["prediction_summary"]
-                prompt += f"- Average predicted daily sales: ${summary.get('avg_predicted_sales', 0):.2f}\n"
-                prompt += f"- Highest sales day: {summary.get('max_predicted_day', '')}, Amount: ${summary.get('max_predicted_value', 0):.2f}\n"
-                prompt += f"- Lowest sales day: {summary.get('min_predicted_day', '')}, Amount: ${summary.get('min_predicted_value', 0):.2f}\n"
-                prompt += f"- Sales trend: {summary.get('trend', 'stable')}, Change: {summary.get('trend_percentage', 0):.1f}%\n\n"
-            
+            if summary:
+                parts.append(f"- Average predicted daily sales: ${summary.get('avg_predicted_sales', 0):.2f}\n")
+                parts.append(f"- Highest sales day: {summary.get('max_predicted_day', '')}, Amount: ${summary.get('max_predicted_value', 0):.2f}\n")
+                parts.append(f"- Lowest sales day: {summary.get('min_predicted_day', '')}, Amount: ${summary.get('min_predicted_value', 0):.2f}\n")
+                parts.append(f"- Sales trend: {summary.get('trend', 'stable')}, Change: {summary.get('trend_percentage', 0):.1f}%\n\n")
+
             # Add best model information
-            if "prediction_results" in forecast_data and "best_model" in forecast_data["prediction_results"]:
-                best_model = forecast_data["prediction_results"]["best_model"]
-                prompt += f"- Best prediction model: {best_model.get('model_type', '').replace('_', ' ')}\n"
-                prompt += f"- Model accuracy: {best_model.get('accuracy_score', 0) * 100:.1f}%\n\n"
-            
+            if best_model:
+                parts.append(f"- Best prediction model: {best_model.get('model_type', '').replace('_', ' ')}\n")
+                parts.append(f"- Model accuracy: {best_model.get('accuracy_score', 0) * 100:.1f}%\n\n")
+
             # Add chart data summary if available
             if "chart_data" in forecast_data and forecast_data["chart_data"]:
                 chart_data = forecast_data["chart_data"]
-                prompt += "- Sales data points:\n"
-                
+                n_points = len(chart_data)
+                parts.append("- Sales data points:\n")
+
                 # Limit to first 10 points to avoid overwhelming the AI
-                for i, data_point in enumerate(chart_data[:10]):
-                    prompt += f"  - {data_point.get('date', '')}: Actual ${data_point.get('actual', 0):.2f}, Predicted ${data_point.get('predicted', 0):.2f}\n"
-                
-                if len(chart_data) > 10:
-                    prompt += f"  - (Plus {len(chart_data) - 10} more data points...)\n\n"
-        
+                parts.extend(
+                    f"  - {data_point.get('date', '')}: Actual ${data_point.get('actual', 0):.2f}, Predicted ${data_point.get('predicted', 0):.2f}\n"
+                    for data_point in chart_data[:10]
+                )
+
+                if n_points > 10:
+                    parts.append(f"  - (Plus {n_points - 10} more data points...)\n\n")
+
         # Add product data
         if products_data:
-            prompt += "## PRODUCT PERFORMANCE DATA\n"
-            
+            parts.append("## PRODUCT PERFORMANCE DATA\n")
+
+            product_details = products_data.get("product_details") or []
+
             # Add product summary
             if "summary" in products_data:
                 summary = products_data["summary"]
-                prompt += f"- Total unique products: {summary.get('total_products', 0)}\n"
-                prompt += f"- Top 5 products percentage: {summary.get('top_five_percentage', 0):.1f}%\n"
-                prompt += f"- Top category: {summary.get('top_category', '')}, Percentage: {summary.get('top_category_percentage', 0):.1f}%\n"
-                prompt += f"- Highest margin product: {summary.get('highest_margin_product', '')}\n\n"
-            
+                parts.append(f"- Total unique products: {summary.get('total_products', 0)}\n")
+                parts.append(f"- Top 5 products percentage: {summary.get('top_five_percentage', 0):.1f}%\n")
+                parts.append(f"- Top category: {summary.get('top_category', '')}, Percentage: {summary.get('top_category_percentage', 0):.1f}%\n")
+                parts.append(f"- Highest margin product: {summary.get('highest_margin_product', '')}\n\n")
+
             # Add top products data
-            if "product_details" in products_data and products_data["product_details"]:
-                prompt += "- Top products (revenue):\n"
-                
+            if product_details:
+                parts.append("- Top products (revenue):\n")
+
                 # List top 5 products for brevity
-                top_products = products_data["product_details"][:5]
-                for i, product in enumerate(top_products):
-                    prompt += f"  - #{i+1}: {product.get('name', '')}, Category: {product.get('category', '')}, Revenue: ${product.get('revenue', 0):.2f}, Percentage: {product.get('percentage', 0):.1f}%\n"
-        
-        # instructions for the AI
-        prompt += "\n## REPORT STRUCTURE\n"
-        prompt += "Please generate a comprehensive business report with the following sections:\n"
-        prompt += "1. SUMMARY: A concise overview of the restaurant's sales performance and key findings.\n"
-        prompt += "2. KEY_INSIGHTS: 4-6 specific, data-backed insights from the sales and product data.\n"
-        prompt += "3. RECOMMENDATIONS: 4-6 actionable recommendations for improving sales and business performance.\n"
-        prompt += "4. FUTURE_OUTLOOK: Projections for future performance and potential challenges/opportunities.\n\n"
-        prompt += "Use clear section headings and ensure recommendations are specific to this restaurant's data."
-        
-        return prompt
+                parts.extend(
+                    f"  - #{i+1}: {product.get('name', '')}, Category: {product.get('category', '')}, Revenue: ${product.get('revenue', 0):.2f}, Percentage: {product.get('percentage', 0):.1f}%\n"
+                    for i, product in enumerate(product_details[:5])
+                )
+
+        # Add precomputed sales pattern rollups if processing cached them
+        if sales_patterns:
+            parts.append("\n## SALES PATTERNS\n")
+
+            by_day = sales_patterns.get("by_day")
+            if by_day:
+                day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+                busiest_day = max(by_day, key=by_day.get)
+                try:
+                    busiest_day = day_names[int(busiest_day)]
+                except (ValueError, IndexError):
+                    busiest_day = str(busiest_day)
+                parts.append(f"- Busiest day of week by revenue: {busiest_day}\n")
+
+            by_hour = sales_patterns.get("by_hour")
+            if by_hour:
+                busiest_hour = max(by_hour, key=by_hour.get)
+                parts.append(f"- Busiest hour by revenue: {busiest_hour}:00\n")
+
+        return ''.join(parts)
     
     def _parse_ai_response(self, response_text: str) -> Dict[str, Any]:
         """Parses AI response into structured sections."""
-        
+
         # Initialize sections
         report = {
             "summary": "",
@@ -159,47 +538,18 @@ class AIReportGenerator:
             "recommendations": [],
             "future_outlook": ""
         }
-        
-        # Extract sections using headers as delimiters
-        current_section = None
-        section_text = ""
-        
-        for line in response_text.split('\n'):
-            # Check for section headers
-            lower_line = line.lower()
-            
-            if "summary" in lower_line and (":" in line or "#" in line):
-                if current_section and section_text:
-                    self._update_report_section(report, current_section, section_text)
-                current_section = "summary"
-                section_text = ""
-            elif any(keyword in lower_line for keyword in ["key insights", "insights", "key_insights"]) and (":" in line or "#" in line):
-                if current_section and section_text:
-                    self._update_report_section(report, current_section, section_text)
-                current_section = "insights"
-                section_text = ""
-            elif any(keyword in lower_line for keyword in ["recommendations", "recommendation"]) and (":" in line or "#" in line):
-                if current_section and section_text:
-                    self._update_report_section(report, current_section, section_text)
-                current_section = "recommendations"
-                section_text = ""
-            elif any(keyword in lower_line for keyword in ["future outlook", "outlook", "projection", "future_outlook"]) and (":" in line or "#" in line):
-                if current_section and section_text:
-                    self._update_report_section(report, current_section, section_text)
-                current_section = "future_outlook"
-                section_text = ""
-            elif current_section:
-                # Add line to current section
-                if line.strip():  # Ignore empty lines
-                    section_text += line + "\n"
-        
-        # Add the last section
-        if current_section and section_text:
-            self._update_report_section(report, current_section, section_text)
-        
+
+        # One compiled-regex scan splits the text into
+        # [preamble, header1, body1, header2, body2, ...]
+        parts = _SECTION_RE.split(response_text)
+        for header, body in zip(parts[1::2], parts[2::2]):
+            section = _HEADER_TO_KEY.get(header.lower().strip().replace(' ', '_'))
+            if section and body.strip():
+                self._update_report_section(report, section, body)
+
         # Clean up the report
         self._clean_report(report)
-        
+
         return report
     
     def _update_report_section(self, report: Dict[str, Any], section: str, text: str) -> None:
@@ -221,7 +571,7 @@ class AIReportGenerator:
                     continue
                 
                 # Check if this is a new item (starts with number, dash, or asterisk)
-                if stripped_line[0].isdigit() or stripped_line[0] in ['-', '*', '•']:
+                if stripped_line[0].isdigit() or stripped_line[0] in _BULLET_CHARS:
                     # If we have a current item, add it to the list
                     if current_item:
                         items.append(current_item.strip())
@@ -282,11 +632,11 @@ class AIReportGenerator:
         
         # Extract product insights
         if products_data and "summary" in products_data:
-            summary = products_data["summary"]
-            top_category = summary.get("top_category", "")
-            top_category_pct = summary.get("top_category_percentage", 0)
-            top_product = summary.get("highest_margin_product", "")
-            top_five_pct = summary.get("top_five_percentage", 0)
+            summary = {**_PRODUCT_SUMMARY_DEFAULTS, **products_data["summary"]}
+            top_category = summary["top_category"]
+            top_category_pct = summary["top_category_percentage"]
+            top_product = summary["highest_margin_product"]
+            top_five_pct = summary["top_five_percentage"]
             
             if top_product:
                 insights.append(f"Your top product '{top_product}' is your revenue leader.")
@@ -301,46 +651,40 @@ class AIReportGenerator:
             if "product_details" in products_data and products_data["product_details"]:
                 recommendations.append(f"Feature '{top_product}' prominently in marketing materials to leverage its popularity.")
         
-        # Extract forecast insights
-        if forecast_data and "prediction_results" in forecast_data:
-            if "prediction_summary" in forecast_data["prediction_results"]:
-                summary = forecast_data["prediction_results"]["prediction_summary"]
-                trend = summary.get("trend", "")
-                trend_pct = summary.get("trend_percentage", 0)
-                
-                if trend == "up" and trend_pct > 0:
-                    insights.append(f"Sales are trending upward by {trend_pct:.1f}%, indicating positive business momentum.")
-                    future_trend = "upward"
-                elif trend == "down" and trend_pct > 0:
-                    insights.append(f"Sales are showing a downward trend of {trend_pct:.1f}%, which requires attention.")
-                    recommendations.append("Implement targeted promotions to reverse the declining sales trend.")
-                    future_trend = "downward"
-                else:
-                    insights.append("Sales patterns are relatively stable, providing a consistent revenue base.")
-                    future_trend = "stable"
-                
-                best_day = summary.get("max_predicted_day", "")
-                worst_day = summary.get("min_predicted_day", "")
+        # Extract forecast insights; hoist the nested sections into locals
+        prediction_results = (forecast_data or {}).get("prediction_results") or {}
+        if prediction_results:
+            if "prediction_summary" in prediction_results:
+                summary = {**_PREDICTION_SUMMARY_DEFAULTS, **prediction_results["prediction_summary"]}
+                trend = summary["trend"]
+                trend_pct = summary["trend_percentage"]
+
+                # Dispatch the trend messaging from the table instead of an
+                # if-chain; anything but a positive up/down move is stable
+                key = trend if trend in ('up', 'down') and trend_pct > 0 else 'stable'
+                insight_msg, extra_rec, future_trend, outlook_tail = _TREND_MESSAGES[key]
+                insights.append(insight_msg.format(pct=trend_pct))
+                if extra_rec:
+                    recommendations.append(extra_rec)
+
+                best_day = summary["max_predicted_day"]
+                worst_day = summary["min_predicted_day"]
                 
                 if best_day and worst_day:
                     insights.append(f"{best_day} shows the highest predicted sales, while {worst_day} shows the lowest.")
                     recommendations.append(f"Consider special promotions on {worst_day} to boost sales during slower periods.")
             
             # Add model insights
-            if "best_model" in forecast_data["prediction_results"]:
-                best_model = forecast_data["prediction_results"]["best_model"]
+            if "best_model" in prediction_results:
+                best_model = prediction_results["best_model"]
                 model_type = best_model.get("model_type", "").replace("_", " ")
                 accuracy = best_model.get("accuracy_score", 0) * 100
                 
                 if model_type and accuracy > 0:
-                    report["future_outlook"] = f"Based on the {model_type} model analysis, sales are showing a {future_trend} trend. "
-                    
-                    if future_trend == "upward":
-                        report["future_outlook"] += "Consider investing in additional capacity and staff training to meet increased demand."
-                    elif future_trend == "downward":
-                        report["future_outlook"] += "Focus on marketing and customer retention strategies to reverse this trend."
-                    else:
-                        report["future_outlook"] += "Maintain current operations while looking for opportunities to increase efficiency and profit margins."
+                    report["future_outlook"] = (
+                        f"Based on the {model_type} model analysis, sales are showing a {future_trend} trend. "
+                        + outlook_tail
+                    )
         
         # Add some generic recommendations if we don't have enough
         if len(recommendations) < 3:
@@ -361,5 +705,5 @@ class AIReportGenerator:
         # Update the report
         report["insights"] = insights[:6]  # Limit to 6 insights
         report["recommendations"] = recommendations[:6]  # Limit to 6 recommendations
-        
-        return report
\ No newline at end of file
+
+        return _FallbackReport(report)
\ No newline at end of file
@@ -3,10 +3,18 @@
 Data cleaning and preprocessing module.
 Handles missing values, normalization, and data transformation.
 """
+import os
+import re
+import glob
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# Compiled once at import: whitespace collapser and a translate table that
+# folds tabs/newlines into plain spaces in pure C before the regex pass
+_WS_RE = re.compile(r'\s+')
+_TAB_TRANS = str.maketrans('\t\n\r', '   ')
+
 class DataCleaner:
     """Cleans and preprocesses restaurant sales data from CSV files."""
     
@@ -15,14 +23,96 @@ class DataCleaner:
         self.original_columns = None
     
     def read_csv(self, file_path: str) -> pd.DataFrame:
-        """Reads CSV file into a DataFrame."""
+        """Reads CSV file into a DataFrame using the multithreaded PyArrow reader."""
         try:
-            df = pd.read_csv(file_path)
+            try:
+                import pyarrow as pa
+                from pyarrow import csv as pa_csv
+                read_options = pa_csv.ReadOptions(use_threads=True, block_size=8 << 20)
+                # Match the pandas parser's null semantics: empty fields
+                # become null (Arrow's default keeps them as ''), so the
+                # 'Unknown' fill in handle_missing_values still applies
+                convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+                table = pa_csv.read_csv(file_path, read_options=read_options,
+                                        convert_options=convert_options)
+                # Keep text columns Arrow-backed: contiguous UTF-8 buffers
+                # are several times smaller than object arrays and .str ops
+                # dispatch to Arrow's C++ kernels. Numeric columns stay
+                # numpy-backed for sklearn
+                df = table.to_pandas(
+                    types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_string(t) else None
+                )
+            except ImportError:
+                # Fall back to the pandas parser if pyarrow is not available,
+                # reading in chunks so the tokenizer's working set stays
+                # bounded for very large uploads
+                chunks = pd.read_csv(file_path, chunksize=500_000)
+                df = pd.concat(chunks, ignore_index=True)
             self.original_columns = df.columns.tolist()
             return df
         except Exception as e:
             raise Exception(f"Error reading CSV file: {str(e)}")
     
+    def read_and_clean(self, file_path: str, chunksize: int = 100_000) -> pd.DataFrame:
+        """Reads and cleans a CSV, streaming large files chunk by chunk.
+
+        Small files take the regular read_csv -> clean_data path (the Arrow
+        reader wins when the whole frame fits comfortably). Past ~256 MiB
+        the file is streamed through the pandas parser and cleaned one
+        chunk at a time, so only a chunk's worth of raw plus cleaned rows
+        is ever live at once instead of two full copies of the dataset.
+        Numeric gap-filling then uses per-chunk medians rather than global
+        ones, which is within noise for chunks this size.
+        """
+        try:
+            large = os.path.getsize(file_path) >= (256 << 20)
+        except OSError:
+            large = False
+        if not large:
+            return self.clean_data(self.read_csv(file_path))
+
+        cleaned_chunks = []
+        original_columns = None
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            if original_columns is None:
+                original_columns = chunk.columns.tolist()
+            cleaned_chunks.append(self.clean_data(chunk))
+        self.original_columns = original_columns
+        self.clean_df = pd.concat(cleaned_chunks, ignore_index=True)
+        return self.clean_df
+
+    def clean_data_cached(self, file_path: str) -> pd.DataFrame:
+        """Reads and cleans a CSV, reusing a Parquet sidecar when unchanged.
+
+        The sidecar name encodes the source file's mtime and size, so any
+        change to the upload invalidates it; a hit skips the whole
+        read + clean pipeline and keeps the cleaned dtypes.
+        """
+        sidecar = None
+        try:
+            st = os.stat(file_path)
+            sidecar = f"{file_path}.clean-{st.st_mtime_ns}-{st.st_size}.parquet"
+            if os.path.exists(sidecar):
+                self.clean_df = pd.read_parquet(sidecar)
+                self.original_columns = self.clean_df.columns.tolist()
+                return self.clean_df
+        except OSError as e:
+            print(f"Error checking clean-data cache: {str(e)}")
+
+        df = self.clean_data(self.read_csv(file_path))
+
+        if sidecar is not None:
+            try:
+                # Drop sidecars left over from earlier versions of the file
+                for old in glob.glob(f"{glob.escape(file_path)}.clean-*.parquet"):
+                    if old != sidecar:
+                        os.remove(old)
+                df.to_parquet(sidecar, compression='zstd')
+            except Exception as e:
+                print(f"Error writing clean-data cache: {str(e)}")
+
+        return df
+
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Main cleaning function that orchestrates all cleaning steps."""
         # Create a copy to avoid modifying the original
@@ -44,34 +134,75 @@ class DataCleaner:
             print("Missing values found:")
             print(missing_summary[missing_summary > 0])
         
-        # Strategy for different column types:
-        # Numeric columns: fill with median
+        # Move any object-dtype text columns (e.g. from the fallback CSV
+        # engine) onto the nullable Arrow string dtype: 40-60% less memory
+        # than object arrays and explicit pd.NA for missing values
+        object_columns = df.select_dtypes(include=['object']).columns
+        if len(object_columns):
+            try:
+                df[object_columns] = df[object_columns].astype('string[pyarrow]')
+            except (ImportError, TypeError, ValueError):
+                # Mixed-type or pyarrow-less environments keep object dtype
+                pass
+
+        # Strategy for different column types, applied in one fillna call:
+        # numeric columns get their median (computed in a single pass over
+        # all of them), text columns get 'Unknown' - the ML pipeline and the
+        # product aggregations need non-null labels
         numeric_columns = df.select_dtypes(include=[np.number]).columns
-        for col in numeric_columns:
-            df[col] = df[col].fillna(df[col].median())
-        
-        # Text columns: fill with 'Unknown' or most frequent value
-        text_columns = df.select_dtypes(include=['object']).columns
-        for col in text_columns:
-            df[col] = df[col].fillna('Unknown')
-        
+        fill_values = df[numeric_columns].median().to_dict() if len(numeric_columns) else {}
+        fill_values.update({col: 'Unknown' for col in df.select_dtypes(include=['object', 'string']).columns})
+        if fill_values:
+            df.fillna(fill_values, inplace=True)
+
         return df
     
     def normalize_text_fields(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalizes text fields like food names and categories."""
-        text_columns = df.select_dtypes(include=['object']).columns
-        
-        for col in text_columns:
-            # Convert to string type
-            df[col] = df[col].astype(str)
-            # Strip whitespace
-            df[col] = df[col].str.strip()
-            # Convert to lowercase (except proper names if needed)
-            if col not in ['pizza_name_id']:  # Keep pizza IDs as is
-                df[col] = df[col].str.lower()
-            # Replace multiple spaces with single space
-            df[col] = df[col].str.replace(r'\s+', ' ', regex=True)
-        
+        text_columns = df.select_dtypes(include=['object', 'string']).columns
+        if len(text_columns) == 0:
+            return df
+
+        def _normalize(series, lowercase):
+            # Fused chain: convert, strip, (lower,) collapse whitespace;
+            # translate folds tab/newline runs cheaply so the compiled regex
+            # only has to collapse the remaining space runs. String-dtype
+            # columns skip the object cast and stay on Arrow kernels
+            if not pd.api.types.is_string_dtype(series):
+                series = series.astype(str)
+            series = series.str.translate(_TAB_TRANS).str.strip()
+            if lowercase:
+                series = series.str.lower()
+            if isinstance(series.dtype, pd.ArrowDtype):
+                # Arrow's regex kernel compiles its own pattern and rejects
+                # re.Pattern objects
+                return series.str.replace(_WS_RE.pattern, ' ', regex=True)
+            return series.str.replace(_WS_RE, ' ', regex=True)
+
+        def _normalize_column(series, lowercase):
+            # These columns hold a handful of repeated values (categories,
+            # product names), so normalize the unique categories and
+            # broadcast back through the codes: string work drops from
+            # O(rows) to O(unique)
+            cat = series.astype('category')
+            codes = cat.cat.codes.to_numpy()
+            categories = cat.cat.categories
+            if 0 < len(categories) <= max(1, len(series) // 2) and codes.min() >= 0:
+                normalized = _normalize(pd.Series(categories), lowercase).to_numpy()
+                result = pd.Series(normalized[codes], index=series.index)
+                if pd.api.types.is_string_dtype(series):
+                    result = result.astype(series.dtype)
+                return result
+            return _normalize(series, lowercase)
+
+        # Batch the normalization over all text columns at once, keeping
+        # pizza IDs out of the lowercase pass
+        lower_columns = text_columns.difference(['pizza_name_id'])
+        if len(lower_columns):
+            df[lower_columns] = df[lower_columns].apply(_normalize_column, lowercase=True)
+        if 'pizza_name_id' in text_columns:
+            df['pizza_name_id'] = _normalize_column(df['pizza_name_id'], lowercase=False)
+
         return df
     
     def convert_dates(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -79,12 +210,13 @@ class DataCleaner:
         # Handle the order_date specifically since it's in dd/mm/yyyy format
         if 'order_date' in df.columns:
             try:
-                df['order_date'] = pd.to_datetime(df['order_date'], format='%d/%m/%Y')
+                # cache=True dedupes repeated date strings before parsing
+                df['order_date'] = pd.to_datetime(df['order_date'], format='%d/%m/%Y', cache=True)
             except Exception as e:
                 print(f"Error converting order_date: {str(e)}")
                 # Try with dayfirst=True as fallback
                 try:
-                    df['order_date'] = pd.to_datetime(df['order_date'], dayfirst=True)
+                    df['order_date'] = pd.to_datetime(df['order_date'], dayfirst=True, cache=True)
                 except Exception as e:
                     print(f"Error with dayfirst conversion: {str(e)}")
         
@@ -99,21 +231,19 @@ class DataCleaner:
         # Create datetime column if both date and time are present
         if 'order_date' in df.columns and 'order_time' in df.columns:
             try:
-                # Convert date to string format for concatenation
-                date_str = df['order_date'].dt.strftime('%Y-%m-%d')
-                # Remove any whitespace from time
-                time_str = df['order_time'].str.strip()
-                # Combine and convert to datetime
-                df['datetime'] = pd.to_datetime(date_str + ' ' + time_str)
-                
+                # Add the time-of-day as a Timedelta instead of round-tripping
+                # through strftime/concatenate/re-parse: one vectorized addition
+                df['datetime'] = df['order_date'] + pd.to_timedelta(df['order_time'].str.strip())
+
                 # Extract useful time features
-                df['hour'] = df['datetime'].dt.hour
-                df['day_of_week'] = df['datetime'].dt.dayofweek
-                df['month'] = df['datetime'].dt.month
-                df['year'] = df['datetime'].dt.year
+                dt = df['datetime'].dt
+                df['hour'] = dt.hour
+                df['day_of_week'] = dt.dayofweek
+                df['month'] = dt.month
+                df['year'] = dt.year
             except Exception as e:
                 print(f"Error creating datetime column: {str(e)}")
-        
+
         return df
     
     def prepare_for_ml(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -121,23 +251,22 @@ class DataCleaner:
         # Ensure we have a datetime column if not already created
         if 'datetime' not in df.columns and 'order_date' in df.columns and 'order_time' in df.columns:
             try:
-                # Convert date to string format for concatenation
-                date_str = df['order_date'].dt.strftime('%Y-%m-%d')
-                # Remove any whitespace from time
-                time_str = df['order_time'].str.strip()
-                # Combine and convert to datetime
-                df['datetime'] = pd.to_datetime(date_str + ' ' + time_str)
+                # Same arithmetic composition as convert_dates
+                df['datetime'] = df['order_date'] + pd.to_timedelta(df['order_time'].astype(str).str.strip())
             except Exception as e:
                 print(f"Error in prepare_for_ml datetime creation: {str(e)}")
         
         # Create total revenue column if not exists
         if 'total_price' in df.columns:
-            # Ensure price columns are numeric
-            numeric_cols = ['unit_price', 'total_price', 'quantity']
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-        
+            # Ensure price columns are numeric, coercing all of them in one
+            # dispatch; downcast shrinks the price columns to float32 and
+            # quantity to the smallest integer type that fits
+            price_cols = [c for c in ('unit_price', 'total_price') if c in df.columns]
+            if price_cols:
+                df[price_cols] = df[price_cols].apply(pd.to_numeric, errors='coerce', downcast='float')
+            if 'quantity' in df.columns:
+                df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce', downcast='integer')
+
         return df
     
     def encode_categorical_variables(self, df: pd.DataFrame) -> pd.DataFrame:
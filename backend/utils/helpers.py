@@ -4,84 +4,129 @@ Helper functions for the application.
 """
 import os
 import uuid
+import functools
 from datetime import datetime
 import shutil
 from pathlib import Path
 import json
 from fastapi import UploadFile
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def generate_file_id() -> str:
     """Generates unique file identifier."""
     return str(uuid.uuid4())
 
 async def save_uploaded_file(file: UploadFile, filename: str) -> str:
-    """Saves uploaded file to disk and returns the saved file path."""
+    """Saves uploaded file to disk in chunks and returns the saved file path."""
     try:
         # Create the data directory if it doesn't exist
         data_dir = get_data_directory()
-        
+
         # Generate a unique filename to prevent collisions
         file_id = generate_file_id()
         file_extension = Path(filename).suffix
         saved_filename = f"{file_id}{file_extension}"
-        
+
         # Full path for saving
         save_path = os.path.join(data_dir, saved_filename)
-        
-        # Save the file
-        contents = await file.read()
-        with open(save_path, 'wb') as buffer:
-            buffer.write(contents)
-        
+
+        # Stream the upload to disk in 1 MiB chunks so memory stays flat
+        # regardless of file size
+        try:
+            import aiofiles
+            async with aiofiles.open(save_path, 'wb') as buffer:
+                while chunk := await file.read(1 << 20):
+                    await buffer.write(chunk)
+        except ImportError:
+            # Fall back to blocking writes if aiofiles is not installed
+            with open(save_path, 'wb') as buffer:
+                while chunk := await file.read(1 << 20):
+                    buffer.write(chunk)
+
         return save_path
     except Exception as e:
         raise Exception(f"Error saving file: {str(e)}")
 
+@functools.lru_cache(maxsize=1)
 def get_data_directory() -> str:
     """Returns path to data directory, creating it if it doesn't exist."""
     base_dir = Path(__file__).parent.parent.parent  # Get project root
     data_dir = base_dir / 'data' / 'uploads'
-    
-    # Create the directory if it doesn't exist
+
+    # Create the directory once per process; every request path calls this
     data_dir.mkdir(parents=True, exist_ok=True)
-    
+
     return str(data_dir)
 
+@functools.lru_cache(maxsize=1)
 def get_processed_data_directory() -> str:
     """Returns path to processed data directory."""
     base_dir = Path(__file__).parent.parent.parent  # Get project root
     processed_dir = base_dir / 'data' / 'processed'
-    
-    # Create the directory if it doesn't exist
+
+    # Create the directory once per process; every request path calls this
     processed_dir.mkdir(parents=True, exist_ok=True)
-    
+
     return str(processed_dir)
 
+# In-process metadata cache keyed by file_id; entries carry the file's
+# mtime so stale copies are detected when another worker rewrites the file
+_metadata_cache = {}
+
 def save_processing_metadata(file_id: str, metadata: dict) -> str:
     """Saves metadata about processed files."""
     metadata_dir = Path(get_processed_data_directory()) / 'metadata'
     metadata_dir.mkdir(exist_ok=True, parents=True)
-    
+
     metadata_file = metadata_dir / f"{file_id}_metadata.json"
-    
+
     # Add timestamp to metadata
     metadata['processing_timestamp'] = datetime.now().isoformat()
-    
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2)
-    
+
+    # orjson formats in C and serializes numpy scalars natively, so the
+    # aggregate rollups need no manual int()/float() casts
+    if orjson is not None:
+        with open(metadata_file, 'wb') as f:
+            f.write(orjson.dumps(
+                metadata,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
+    else:
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    # Refresh the cache so subsequent loads skip the disk round-trip
+    _metadata_cache[file_id] = (os.path.getmtime(metadata_file), dict(metadata))
+
     return str(metadata_file)
 
 def load_processing_metadata(file_id: str) -> dict:
     """Loads metadata for a processed file."""
     metadata_dir = Path(get_processed_data_directory()) / 'metadata'
     metadata_file = metadata_dir / f"{file_id}_metadata.json"
-    
+
     if not metadata_file.exists():
+        _metadata_cache.pop(file_id, None)
         raise FileNotFoundError(f"Metadata file not found for {file_id}")
-    
-    with open(metadata_file, 'r') as f:
-        return json.load(f)
+
+    mtime = os.path.getmtime(metadata_file)
+    cached = _metadata_cache.get(file_id)
+    if cached is not None and cached[0] == mtime:
+        return dict(cached[1])
+
+    if orjson is not None:
+        with open(metadata_file, 'rb') as f:
+            metadata = orjson.loads(f.read())
+    else:
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+    _metadata_cache[file_id] = (mtime, dict(metadata))
+    return metadata
 
 def cleanup_old_files(days_old: int = 7):
     """Removes files older than specified days."""
@@ -90,8 +135,14 @@ def cleanup_old_files(days_old: int = 7):
     
     cutoff_time = datetime.now().timestamp() - (days_old * 24 * 60 * 60)
     
-    # Clean up both uploaded and processed files
+    # Clean up both uploaded and processed files; scandir serves type and
+    # mtime from the cached dirent, halving the per-entry syscalls that
+    # glob + stat would make
     for directory in [data_dir, processed_dir]:
-        for file_path in directory.glob('*'):
-            if file_path.is_file() and file_path.stat().st_mtime < cutoff_time:
-                file_path.unlink()
\ No newline at end of file
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff_time:
+                        os.unlink(entry.path)
+        except FileNotFoundError:
+            continue
\ No newline at end of file
@@ -0,0 +1,30 @@
+# Runs data processing and model training back-to-back in one process,
+# handing the feature matrix between stages in memory instead of
+# round-tripping it through disk files
+import sys
+from pathlib import Path
+
+# Add the project root to the path
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from test_data_processing import test_data_processing
+from test_model_training import test_model_training
+
+def run_pipeline(save_intermediate: bool = False):
+    """Run the full processing + training pipeline with an in-memory handoff.
+
+    Args:
+        save_intermediate: Also write the processed/cleaned data files to
+            disk for offline inspection (what the standalone scripts do)
+    """
+    X, y, feature_names = test_data_processing(save_outputs=save_intermediate)
+
+    if X is None or y is None:
+        print("Data processing did not produce a feature matrix and target; skipping training.")
+        return
+
+    test_model_training(X, y)
+
+if __name__ == "__main__":
+    run_pipeline(save_intermediate="--save-intermediate" in sys.argv)
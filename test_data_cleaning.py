@@ -49,9 +49,15 @@ def test_data_cleaning():
             print(f"\nTotal revenue: ${cleaned_df['total_price'].sum():.2f}")
             print(f"Average order value: ${cleaned_df['total_price'].mean():.2f}")
         
-        # Save cleaned data to a new CSV
-        cleaned_df.to_csv("cleaned_pizza_sales.csv", index=False)
-        print("\nCleaned data saved to 'cleaned_pizza_sales.csv'")
+        # Save cleaned data as Parquet (typed, compressed, much faster to
+        # reload for the ML steps); fall back to CSV without a parquet engine
+        try:
+            cleaned_df.to_parquet("cleaned_pizza_sales.parquet", index=False, compression='zstd')
+            print("\nCleaned data saved to 'cleaned_pizza_sales.parquet'")
+        except Exception as parquet_error:
+            print(f"Parquet save failed ({parquet_error}), falling back to CSV")
+            cleaned_df.to_csv("cleaned_pizza_sales.csv", index=False)
+            print("\nCleaned data saved to 'cleaned_pizza_sales.csv'")
         
     except Exception as e:
         print(f"Error: {str(e)}")